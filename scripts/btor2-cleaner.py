@@ -1,107 +1,204 @@
+import ctypes
+import mmap
 import sys
 import os
+from itertools import islice
 
-def process_btor2_file(input_path, output_path):
+# Number of output lines joined into a single write; bounds the memory held for output.
+WRITE_CHUNK_LINES = 64 * 1024
+# Optional C implementation of the cleaner, built from btor_clean.c:
+#     cc -O2 -shared -fPIC -o libbtor_clean.so btor_clean.c
+NATIVE_CLEANER_LIB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'libbtor_clean.so')
+
+def load_native_cleaner():
     """
-    Reads and cleans a non-standard BTOR2 file using a robust, multi-stage
-    process that validates all potential signal names and handles all comment types.
+    Returns the clean_btor2() function from the native library, or None if it has not been built.
     """
-    if not os.path.exists(input_path):
-        print(f"Error: Input file not found at '{input_path}'")
-        return
-
-    print(f"Reading from: {input_path}")
-
-    with open(input_path, 'r') as f:
-        lines = f.readlines()
-
-    processed_lines = []
-    i = 0
-    total_lines = len(lines)
-
-    while i < total_lines:
-        current_line_raw = lines[i].strip()
+    if not os.path.exists(NATIVE_CLEANER_LIB):
+        return None
+    try:
+        lib = ctypes.CDLL(NATIVE_CLEANER_LIB)
+    except OSError:
+        return None
+    lib.clean_btor2.argtypes = [
+        ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p, ctypes.c_size_t, ctypes.POINTER(ctypes.c_size_t)
+    ]
+    lib.clean_btor2.restype = ctypes.c_int
+    return lib.clean_btor2
+
+def clean_btor2_native(clean_btor2, input_path):
+    """
+    Cleans the whole file with one call into the native library.
+    Returns a view of the cleaned bytes, or None if the input must go through the Python implementation.
+    """
+    input_size = os.path.getsize(input_path)
+    if input_size == 0:
+        return b""  # An empty file cannot be mapped.
+
+    # Room for every input byte plus a final newline the input may lack.
+    out_capacity = input_size + 2
+    out_buffer = ctypes.create_string_buffer(out_capacity)
+    out_length = ctypes.c_size_t()
+
+    with open(input_path, 'rb') as f:
+        # ACCESS_COPY gives a writable (copy-on-write) mapping that ctypes can point into.
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY) as mapped:
+            in_buffer = (ctypes.c_char * input_size).from_buffer(mapped)
+            status = clean_btor2(in_buffer, input_size, out_buffer, out_capacity, ctypes.byref(out_length))
+            del in_buffer
+
+    if status != 0:
+        return None
+    # Hand back a view of the output buffer rather than copying it into a bytes object.
+    return memoryview(out_buffer)[:out_length.value]
+
+def clean_btor2_lines(f):
+    """
+    Yields the cleaned lines of a BTOR2 file opened in binary mode, as bytes without line endings.
+    """
+    # Stream the file; the only lookahead needed is the next line, which is
+    # pushed back here when it turns out not to be this line's name comment.
+    pushed_back_line = None
+
+    while True:
+        if pushed_back_line is not None:
+            raw_line = pushed_back_line
+            pushed_back_line = None
+        else:
+            raw_line = f.readline()
+            if not raw_line:
+                break
+
+        # Only the leading whitespace matters for the checks below; the trailing
+        # whitespace is stripped with the trailing comment in STAGE 1.
+        current_line_raw = raw_line.lstrip()
 
         # Skip empty lines or purely decorative comments like '; begin' or '; end'
-        if not current_line_raw or current_line_raw.startswith(('; begin', '; end')):
-            i += 1
+        if not current_line_raw or current_line_raw.startswith((b'; begin', b'; end')):
             continue
 
         # --- STAGE 1: Clean the current line and identify its parts ---
 
         # First, remove any trailing decorative comment (e.g., '; combined_blackboxed.v...')
-        line_no_trailing_comment = current_line_raw.split(';', 1)[0].strip()
+        line_no_trailing_comment = current_line_raw.split(b';', 1)[0].strip()
 
         if not line_no_trailing_comment:
-            i += 1
             continue
 
         tokens = line_no_trailing_comment.split()
         command_id = tokens[0]
 
-        # Find the index of the LAST token that is a number.
+        # Find the index of the LAST token that is a number, scanning from the end.
         last_numeric_idx = -1
-        for j, token in enumerate(tokens):
-            if token.isdigit():
+        for j in range(len(tokens) - 1, -1, -1):
+            if tokens[j].isdigit():
                 last_numeric_idx = j
-        
+                break
+
         # The base command is everything up to and including that last number.
         base_command_tokens = tokens[:last_numeric_idx + 1]
-        base_command = ' '.join(base_command_tokens)
-        
+        base_command = b' '.join(base_command_tokens)
+
         # The inline symbol is everything after the last number.
         inline_symbol_tokens = tokens[last_numeric_idx + 1:]
-        good_inline_name = ""
+        good_inline_name = b""
         if inline_symbol_tokens:
-            potential_inline_name = ' '.join(inline_symbol_tokens)
+            potential_inline_name = b' '.join(inline_symbol_tokens)
             # A good inline name is one that does NOT contain '$'
-            if '$' not in potential_inline_name:
+            if b'$' not in potential_inline_name:
                 good_inline_name = potential_inline_name
 
 
         # --- STAGE 2: Hunt for a higher-priority name on the next line ---
-        comment_name = "" # Default to no name from comments
+        comment_name = b"" # Default to no name from comments
+
+        next_line_raw = f.readline()
+        if next_line_raw:
+            pushed_back_line = next_line_raw
 
-        if (i + 1) < total_lines:
-            next_line_stripped = lines[i + 1].strip()
-            
-            if next_line_stripped.startswith(';'):
-                next_tokens = next_line_stripped.split()
+            # split() drops the surrounding whitespace itself, so the line is only lstripped.
+            if next_line_raw.lstrip().startswith(b';'):
+                next_tokens = next_line_raw.split()
                 if len(next_tokens) >= 3 and next_tokens[1] == command_id:
-                    # This is the name comment. Extract the potential name.
-                    potential_name_from_comment = ' '.join(next_tokens[2:])
-                    
-                    # VALIDATION: Only accept the name if it is NOT junk.
-                    if '$' not in potential_name_from_comment:
-                        name = potential_name_from_comment
-                        if name.startswith('\\'):
+                    # This is the name comment. VALIDATION: Only accept the name
+                    # if it is NOT junk; check the tokens before joining them.
+                    name_tokens = next_tokens[2:]
+                    if not any(b'$' in token for token in name_tokens):
+                        name = b' '.join(name_tokens)
+                        if name.startswith(b'\\'):
                             name = name[1:]
                         comment_name = name
-                    
-                    i += 1  # Consume the comment line (whether its name was good or junk)
+
+                    pushed_back_line = None  # Consume the comment line (whether its name was good or junk)
 
         # --- STAGE 3: Reconstruct the final line with correct name precedence ---
         final_line = base_command
-        
+
         # The name from the comment on the next line has the HIGHEST priority.
         if comment_name:
-            final_line += f" {comment_name}"
+            final_line += b" " + comment_name
         # If there was no valid comment name, fall back to the valid INLINE name.
         elif good_inline_name:
-            final_line += f" {good_inline_name}"
-            
-        processed_lines.append(final_line)
-        
-        i += 1
+            final_line += b" " + good_inline_name
+
+        yield final_line
+
+def process_btor2_file(input_path, output_path):
+    """
+    Reads and cleans a non-standard BTOR2 file using a robust, multi-stage
+    process that validates all potential signal names and handles all comment types.
+    """
+    if not os.path.exists(input_path):
+        print(f"Error: Input file not found at '{input_path}'")
+        return
 
-    # --- Write the processed content to the output file ---
+    print(f"Reading from: {input_path}")
+
+    clean_btor2 = load_native_cleaner()
+    if clean_btor2 is not None:
+        cleaned = clean_btor2_native(clean_btor2, input_path)
+        if cleaned is not None:
+            try:
+                with open(output_path, 'wb') as f:
+                    f.write(cleaned)
+                print(f"Success! Cleaned BTOR2 file written to: {output_path}")
+            except IOError as e:
+                print(f"Error: Could not write to output file '{output_path}'. Reason: {e}")
+            return
+        print("Native cleaner cannot handle this input; using the Python cleaner.")
+
+    # Write to a temporary file next to the output and move it into place at the end, so an
+    # output path that names the input does not truncate it before it has been read.
+    temp_output_path = output_path + '.tmp'
     try:
-        with open(output_path, 'w') as f:
-            for line in processed_lines:
-                f.write(line + '\n')
-        print(f"Success! Cleaned BTOR2 file written to: {output_path}")
+        # BTOR2 is ASCII: work on bytes throughout and skip the text codec entirely.
+        f = open(input_path, 'rb')
     except IOError as e:
-        print(f"Error: Could not write to output file '{output_path}'. Reason: {e}")
+        print(f"Error: Could not read input file '{input_path}'. Reason: {e}")
+        return
+
+    with f:
+        cleaned_lines = clean_btor2_lines(f)
+        try:
+            with open(temp_output_path, 'wb') as out:
+                # Cleaned lines are written out every WRITE_CHUNK_LINES lines, so memory
+                # use does not grow with the size of the file.
+                while True:
+                    try:
+                        batch = list(islice(cleaned_lines, WRITE_CHUNK_LINES))
+                    except IOError as e:
+                        print(f"Error: Could not read input file '{input_path}'. Reason: {e}")
+                        return
+                    if not batch:
+                        break
+                    out.write(b'\n'.join(batch) + b'\n')
+            os.replace(temp_output_path, output_path)
+            print(f"Success! Cleaned BTOR2 file written to: {output_path}")
+        except IOError as e:
+            print(f"Error: Could not write to output file '{output_path}'. Reason: {e}")
+        finally:
+            if os.path.exists(temp_output_path):
+                os.remove(temp_output_path)
 
 def main():
     if len(sys.argv) != 3:
@@ -0,0 +1,217 @@
+/*
+ * Optional native fast path for btor2-cleaner.py.
+ *
+ * Implements the same cleaning rules as process_btor2_file() over a whole
+ * in-memory BTOR2 file in a single call, so the Python interpreter is not
+ * involved per line. The only whitespace handled here is ' ' and '\n'; inputs
+ * containing any other bytes.split() whitespace ('\t', '\r', '\v', '\f') are
+ * rejected and left to the Python path.
+ *
+ * Build (from the scripts directory):
+ *     cc -O2 -shared -fPIC -o libbtor_clean.so btor_clean.c
+ */
+#include <stddef.h>
+#include <stdint.h>
+#include <string.h>
+
+#define ONES  0x0101010101010101ULL
+#define HIGHS 0x8080808080808080ULL
+/* Non-zero if any byte of x is zero / less than n (n <= 128). */
+#define HASZERO(x)    (((x) - ONES) & ~(x) & HIGHS)
+#define HASLESS(x, n) (((x) - ONES * (n)) & ~(x) & HIGHS)
+
+enum { CLEAN_OK = 0, CLEAN_UNSUPPORTED = 1, CLEAN_OVERFLOW = 2 };
+
+static uint64_t load64(const char *p)
+{
+    uint64_t x;
+    memcpy(&x, p, sizeof x);
+    return x;
+}
+
+static int is_other_space(unsigned char c)
+{
+    return c == '\t' || c == '\r' || c == '\v' || c == '\f';
+}
+
+/* Accept input whose only whitespace is ' ' and '\n'; checked 8 bytes at a time. */
+static int has_plain_whitespace(const char *p, size_t n)
+{
+    size_t i = 0;
+    for (; i + 8 <= n; i += 8) {
+        uint64_t x = load64(p + i);
+        /* '\t' .. '\r' are all below 0x0e; only look closer when such a byte is present. */
+        if (HASLESS(x, 0x0e)) {
+            for (size_t k = 0; k < 8; k++) {
+                if (is_other_space((unsigned char)p[i + k]))
+                    return 0;
+            }
+        }
+    }
+    for (; i < n; i++) {
+        if (is_other_space((unsigned char)p[i]))
+            return 0;
+    }
+    return 1;
+}
+
+/* Non-zero if [p, e) contains a '$'; checked 8 bytes at a time. */
+static int has_dollar(const char *p, const char *e)
+{
+    for (; p + 8 <= e; p += 8) {
+        if (HASZERO(load64(p) ^ (ONES * '$')))
+            return 1;
+    }
+    for (; p < e; p++) {
+        if (*p == '$')
+            return 1;
+    }
+    return 0;
+}
+
+static void trim(const char **s, const char **e)
+{
+    while (*s < *e && **s == ' ')
+        (*s)++;
+    while (*e > *s && (*e)[-1] == ' ')
+        (*e)--;
+}
+
+/* Finds the next space-separated token at or after p; returns 0 when none is left. */
+static int next_token(const char *p, const char *e, const char **ts, const char **te)
+{
+    while (p < e && *p == ' ')
+        p++;
+    if (p == e)
+        return 0;
+    *ts = p;
+    while (p < e && *p != ' ')
+        p++;
+    *te = p;
+    return 1;
+}
+
+static int is_number(const char *s, const char *e)
+{
+    for (; s < e; s++) {
+        if (*s < '0' || *s > '9')
+            return 0;
+    }
+    return 1;
+}
+
+static int starts_with(const char *s, const char *e, const char *prefix)
+{
+    size_t len = strlen(prefix);
+    return (size_t)(e - s) >= len && memcmp(s, prefix, len) == 0;
+}
+
+/* Copies the tokens of [s, e) to dst joined by single spaces; returns the length written. */
+static size_t emit_tokens(char *dst, const char *s, const char *e)
+{
+    const char *ts, *te;
+    size_t n = 0;
+    while (next_token(s, e, &ts, &te)) {
+        if (n)
+            dst[n++] = ' ';
+        memcpy(dst + n, ts, (size_t)(te - ts));
+        n += (size_t)(te - ts);
+        s = te;
+    }
+    return n;
+}
+
+/*
+ * Cleans the BTOR2 text in[0..n) into out[0..out_cap), storing the output
+ * length in *out_n. Returns CLEAN_OK, or CLEAN_UNSUPPORTED / CLEAN_OVERFLOW
+ * when the caller should fall back to the Python implementation.
+ */
+int clean_btor2(const char *in, size_t n, char *out, size_t out_cap, size_t *out_n)
+{
+    const char *end = in + n;
+    const char *line = in;
+    size_t o = 0;
+
+    if (!has_plain_whitespace(in, n))
+        return CLEAN_UNSUPPORTED;
+
+    while (line < end) {
+        const char *nl = memchr(line, '\n', (size_t)(end - line));
+        const char *s = line, *e = nl ? nl : end;
+        const char *next = nl ? nl + 1 : end;
+        const char *ts, *te, *id_s, *id_e, *base_e, *p, *cnl, *ce;
+
+        line = next;
+        trim(&s, &e);
+
+        /* Skip empty lines or purely decorative comments like '; begin' or '; end' */
+        if (s == e || starts_with(s, e, "; begin") || starts_with(s, e, "; end"))
+            continue;
+
+        /* STAGE 1: drop any trailing comment, then split at the last numeric token. */
+        p = memchr(s, ';', (size_t)(e - s));
+        if (p)
+            e = p;
+        trim(&s, &e);
+        if (s == e)
+            continue;
+
+        if (!next_token(s, e, &id_s, &id_e))
+            continue;
+        base_e = s;
+        for (p = s; next_token(p, e, &ts, &te); p = te) {
+            if (is_number(ts, te))
+                base_e = te;
+        }
+
+        cnl = line < end ? memchr(line, '\n', (size_t)(end - line)) : NULL;
+        ce = cnl ? cnl : end;
+
+        /* Worst case: base + ' ' + the longer of the inline and comment names + '\n'. */
+        if (out_cap - o < (size_t)(e - s) + (size_t)(ce - line) + 2)
+            return CLEAN_OVERFLOW;
+
+        o += emit_tokens(out + o, s, base_e);
+
+        /* STAGE 2: a '; <id> <name>' comment on the next line takes precedence. */
+        if (line < end) {
+            const char *cs = line;
+            const char *t1s, *t1e, *t2s, *t2e;
+
+            trim(&cs, &ce);
+            if (cs < ce && *cs == ';'
+                && next_token(cs, ce, &ts, &te)
+                && next_token(te, ce, &t1s, &t1e)
+                && next_token(t1e, ce, &t2s, &t2e)
+                && t1e - t1s == id_e - id_s
+                && memcmp(t1s, id_s, (size_t)(id_e - id_s)) == 0) {
+                /* Consume the comment line, whether its name is good or junk. */
+                line = cnl ? cnl + 1 : end;
+                if (!has_dollar(t2s, ce)) {
+                    size_t len = emit_tokens(out + o + 1, t2s, ce);
+                    char *name = out + o + 1;
+                    if (name[0] == '\\') {
+                        memmove(name, name + 1, len - 1);
+                        len--;
+                    }
+                    if (len) {
+                        out[o] = ' ';
+                        o += 1 + len;
+                        out[o++] = '\n';
+                        continue;
+                    }
+                }
+            }
+        }
+
+        /* STAGE 3: otherwise fall back to a good (no '$') inline name. */
+        if (next_token(base_e, e, &ts, &te) && !has_dollar(base_e, e)) {
+            out[o++] = ' ';
+            o += emit_tokens(out + o, base_e, e);
+        }
+        out[o++] = '\n';
+    }
+
+    *out_n = o;
+    return CLEAN_OK;
+}
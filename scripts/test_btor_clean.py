@@ -0,0 +1,75 @@
+# Checks that the optional native cleaner (btor_clean.c) produces the same output as the
+# Python cleaner in btor2-cleaner.py. Run from the repository root with:
+#     python -m unittest discover -s scripts
+import importlib.util
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_BTOR2 = os.path.join(SCRIPTS_DIR, '..', 'output.btor2')
+
+def load_cleaner_script():
+    """Imports btor2-cleaner.py, whose name is not a valid module name."""
+    spec = importlib.util.spec_from_file_location('btor2_cleaner', os.path.join(SCRIPTS_DIR, 'btor2-cleaner.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# name -> BTOR2 input; every case only uses ' ' and '\n' as whitespace, so the native
+# cleaner must accept it rather than hand it back to the Python path.
+EDGE_CASES = {
+    'backslash_comment_name': b"1 sort bitvec 1\n2 input 1\n; 2 \\clk\n3 state 1 \\inline\n",
+    'junk_inline_name': b"1 sort bitvec 1\n2 input 1 foo$bar\n3 input 1 good name\n",
+    'junk_comment_name': b"1 sort bitvec 1\n2 input 1 inl\n; 2 a$b\n3 input 1\n; 3 $junk\n",
+    'missing_name_comment': b"1 sort bitvec 1\n2 input 1\n3 state 1\n",
+    'mismatched_name_comment': b"1 sort bitvec 1\n2 input 1 inl\n; 3 other\n3 state 1\n; 3 mine\n",
+    'begin_end_comments': b"; begin\n1 sort bitvec 1\n; end\n  ; begin module\n2 input 1 x\n; end\n",
+    'trailing_comment': b"1 sort bitvec 1 ; combined_blackboxed.v:12\n2 input 1 x ; note\n",
+    'no_trailing_newline': b"1 sort bitvec 1\n2 input 1 x\n; 2 y",
+    'empty': b"",
+}
+
+class NativeCleanerMatchesPythonTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        compiler = shutil.which('cc')
+        if compiler is None:
+            raise unittest.SkipTest("no C compiler ('cc') available to build libbtor_clean.so")
+
+        cls.tmpdir = tempfile.mkdtemp()
+        lib_path = os.path.join(cls.tmpdir, 'libbtor_clean.so')
+        subprocess.run(
+            [compiler, '-O2', '-shared', '-fPIC', '-o', lib_path, os.path.join(SCRIPTS_DIR, 'btor_clean.c')],
+            check=True,
+        )
+        cls.cleaner = load_cleaner_script()
+        cls.cleaner.NATIVE_CLEANER_LIB = lib_path
+        cls.clean_btor2 = cls.cleaner.load_native_cleaner()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir, ignore_errors=True)
+
+    def assert_native_matches_python(self, input_path):
+        native = self.cleaner.clean_btor2_native(self.clean_btor2, input_path)
+        self.assertIsNotNone(native, "native cleaner declined the input")
+        with open(input_path, 'rb') as f:
+            python = b''.join(line + b'\n' for line in self.cleaner.clean_btor2_lines(f))
+        self.assertEqual(bytes(native), python)
+
+    def test_sample_file(self):
+        self.assert_native_matches_python(SAMPLE_BTOR2)
+
+    def test_edge_cases(self):
+        for name, content in EDGE_CASES.items():
+            with self.subTest(name):
+                input_path = os.path.join(self.tmpdir, name + '.btor2')
+                with open(input_path, 'wb') as f:
+                    f.write(content)
+                self.assert_native_matches_python(input_path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,232 @@
+# Line-oriented Verilog scanners shared by ext_definition_adder.py and verilog-blackboxing.py.
+# These loops dominate the runtime on large netlists. The module is plain Python so it can be
+# compiled in place for a faster build (`cythonize -i verilog_parse.py` or `mypyc verilog_parse.py`);
+# the scripts import whichever is present.
+# The scanners work on a read-only mmap of the input (see map_verilog_file), so a script
+# can run several passes over the same file without re-reading it from disk.
+import mmap
+import os
+import re
+
+MODULE_DEF_REGEX = re.compile(rb"^\s*module\s+([a-zA-Z_][\w]*)")
+# Handles multiple comma-separated declarations
+DECLARATION_REGEX = re.compile(
+    rb"^\s*(input|output|wire|reg)\s*(?:wire|reg)?\s*(\[.*?\])?\s*([^;]+);"
+)
+ENDMODULE_REGEX = re.compile(rb"^\s*endmodule")
+INST_START_REGEX = re.compile(rb"^\s*([a-zA-Z_][\w]*_ext)\s+([a-zA-Z_][\w]*)?\s*\(")
+PORT_CONN_REGEX = re.compile(rb"^\s*\.([a-zA-Z_][\w]+)\s*\(\s*([a-zA-Z_][\w]+)\s*\)")
+# Regex to capture "module_name instance_name ("
+INST_REGEX = re.compile(rb"^\s*([a-zA-Z_][\w]+)\s+(?:#\s*\(.*?\))?\s*([a-zA-Z_][\w]+)\s*\(")
+# Largest slice of a mapped file copied into memory at once when it is written back out.
+COPY_CHUNK_BYTES = 1024 * 1024
+
+class EmptyVerilogMap:
+    """Stands in for the mmap of an empty file, which cannot be mapped."""
+    def __len__(self):
+        return 0
+
+    def readline(self):
+        return b''
+
+    def seek(self, pos):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def map_verilog_file(filepath):
+    """Memory-maps a Verilog file read-only. The returned mmap can be used as a context manager."""
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return EmptyVerilogMap()  # An empty file cannot be mapped.
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def iter_lines(verilog_map):
+    """Iterates over the lines of a mapped Verilog file, as bytes, from the start."""
+    verilog_map.seek(0)
+    return iter(verilog_map.readline, b'')
+
+def infer_ext_ports(connections, parent_module, module_declarations):
+    """
+    Infers the port list of an _ext module from its (port, wire) connections in its parent.
+    """
+    inferred_ports = []
+    for port_name, wire_name in connections:
+        wire_info = module_declarations.get((parent_module, wire_name))
+        if wire_info is not None:
+            decl_type, width = wire_info
+            inferred_dir = 'input' if decl_type != 'output' else 'output'
+            inferred_ports.append({
+                'name': port_name,
+                'dir': inferred_dir,
+                'width': width
+            })
+    return inferred_ports
+
+
+def parse_and_find(verilog_map, input_filepath):
+    """
+    Single pass: Parses every module's declarations and finds instantiations of missing _ext modules.
+    Instantiations are buffered per parent module and resolved at its 'endmodule', once the
+    parent's declarations are complete.
+    """
+    print(f"Pass 1: Parsing '{input_filepath}' for module declarations and missing blackbox instantiations...")
+
+    defined_modules = set()
+    # (module_name, wire_name) -> (decl_type, width)
+    module_declarations = {}
+    modules_with_declarations = set()
+    # ext_module_name -> (parent_module, inferred_ports), in order of discovery
+    found_ext_modules = {}
+    pending_instantiations = []
+
+    current_module = None
+    parsing_instantiation = False
+    current_connections = []
+    current_ext_module_name = None
+
+    def resolve_pending(parent_module):
+        if parent_module in modules_with_declarations:
+            for ext_module_name, connections in pending_instantiations:
+                if ext_module_name not in found_ext_modules:
+                    found_ext_modules[ext_module_name] = (
+                        parent_module, infer_ext_ports(connections, parent_module, module_declarations)
+                    )
+        pending_instantiations.clear()
+
+    # Bind the match methods once; they are called for nearly every line.
+    match_endmodule = ENDMODULE_REGEX.match
+    match_module_def = MODULE_DEF_REGEX.match
+    match_declaration = DECLARATION_REGEX.match
+    match_inst_start = INST_START_REGEX.match
+    match_port_conn = PORT_CONN_REGEX.match
+
+    for line in iter_lines(verilog_map):
+        if match_endmodule(line):
+            if current_module:
+                resolve_pending(current_module)
+            current_module = None
+        else:
+            module_match = match_module_def(line)
+            if module_match:
+                current_module = module_match.group(1).decode()
+                defined_modules.add(current_module)
+            elif current_module:
+                decl_match = match_declaration(line)
+                if decl_match:
+                    decl_type, width, names_str = decl_match.groups()
+                    # Split the comma-separated list of names and clean them up
+                    names = [name.strip().decode() for name in names_str.split(b',')]
+                    decl_info = (decl_type.decode(), width.strip().decode() if width else "")
+                    for name in names:
+                        if name: # Ensure not an empty string
+                            module_declarations[(current_module, name)] = decl_info
+                            modules_with_declarations.add(current_module)
+
+        if current_module and not parsing_instantiation:
+            inst_match = match_inst_start(line)
+            if inst_match:
+                ext_module_name = inst_match.group(1).decode()
+                if ext_module_name not in defined_modules and ext_module_name not in found_ext_modules:
+                    parsing_instantiation = True
+                    current_ext_module_name = ext_module_name
+                    current_connections = []
+
+        if parsing_instantiation:
+            port_match = match_port_conn(line)
+            if port_match:
+                port_name, connected_wire = port_match.groups()
+                current_connections.append((port_name.decode(), connected_wire.decode()))
+
+            if b");" in line:
+                if current_module:
+                    pending_instantiations.append((current_ext_module_name, current_connections))
+
+                parsing_instantiation = False
+                current_ext_module_name = None
+                current_connections = []
+
+    if current_module:
+        resolve_pending(current_module)
+
+    print(f"Found {len(defined_modules)} existing module definitions and parsed their internal declarations.")
+
+    # An _ext module may be defined further down the file than its first instantiation.
+    missing_modules_to_generate = {}
+    for ext_module_name, (parent_module, inferred_ports) in found_ext_modules.items():
+        if ext_module_name not in defined_modules:
+            missing_modules_to_generate[ext_module_name] = inferred_ports
+            print(f"  Found missing module '{ext_module_name}' in parent '{parent_module}'. Will generate definition.")
+
+    return defined_modules, module_declarations, missing_modules_to_generate
+
+def build_verilog_dependency_graph(verilog_map, fir_filepath):
+    """
+    Parses a Verilog file to build a map of module dependencies.
+    NOTE: This parser is simple and assumes a standard coding style where
+    a module instantiation is on its own line.
+    """
+    dependency_graph = {}
+    # Bound add() of the current module's dependency set; None outside any module.
+    add_dependency = None
+    print(f"Building dependency graph from {fir_filepath}...")
+
+    # Bind the match methods once; they are called for every line.
+    match_module_def = MODULE_DEF_REGEX.match
+    match_inst = INST_REGEX.match
+
+    for line in iter_lines(verilog_map):
+        module_match = match_module_def(line)
+        if module_match:
+            add_dependency = dependency_graph.setdefault(module_match.group(1).decode(), set()).add
+            continue
+
+        if add_dependency is not None:
+            inst_match = match_inst(line)
+            if inst_match:
+                instantiated_module = inst_match.group(1)
+                # Avoid matching the module definition itself
+                if instantiated_module != b"module":
+                    add_dependency(instantiated_module.decode())
+                    
+    print(f"Found {len(dependency_graph)} total modules.")
+    # The graph is read-only from here on.
+    return {module: frozenset(deps) for module, deps in dependency_graph.items()}
+
+def write_map_range(outfile, verilog_map, start, end):
+    """Writes verilog_map[start:end] to outfile in slices of at most COPY_CHUNK_BYTES."""
+    for chunk_start in range(start, end, COPY_CHUNK_BYTES):
+        outfile.write(verilog_map[chunk_start:min(chunk_start + COPY_CHUNK_BYTES, end)])
+
+def annotate_verilog(verilog_map, output_filepath, blacklist_set):
+    """Adds a '(* blackbox *)' annotation to modules in the blacklist_set."""
+    annotated_count = 0
+    print(f"\nWriting annotated Verilog to '{output_filepath}'...")
+
+    match_module_def = MODULE_DEF_REGEX.match
+    with open(output_filepath, 'wb') as outfile:
+        # Unchanged lines are copied straight from the map in bounded slices: pos is the offset
+        # of the current line, copied the offset up to which the input has been written out.
+        pos = 0
+        copied = 0
+        for line in iter_lines(verilog_map):
+            module_match = match_module_def(line)
+            if module_match:
+                module_name = module_match.group(1).decode()
+                if module_name in blacklist_set:
+                    write_map_range(outfile, verilog_map, copied, pos)
+                    copied = pos
+                    indentation = line[:len(line) - len(line.lstrip())]
+                    outfile.write(indentation + b"(* blackbox *)\n")
+                    annotated_count += 1
+            pos += len(line)
+        write_map_range(outfile, verilog_map, copied, len(verilog_map))
+
+    print(f"Annotation complete. Black-boxed {annotated_count} modules.")